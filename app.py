@@ -8,29 +8,98 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+import asyncio
+import hashlib
 import os
+import re
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
-from llama_index.core import SimpleDirectoryReader, Document
-from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core import Document
+from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core.node_parser import TokenTextSplitter
+from llama_index.core.async_utils import asyncio_run
+from llama_index.core.utils import get_tokenizer
 from llama_index.core import Settings
+from llama_index.core.schema import MetadataMode, QueryBundle, TextNode
 from llama_index.core import SummaryIndex, VectorStoreIndex
 from llama_index.core.tools import QueryEngineTool
 from llama_index.core.query_engine.router_query_engine import RouterQueryEngine
 from llama_index.core.selectors import LLMSingleSelector
+from llama_index.core.base.base_selector import BaseSelector
 
 from llama_index.llms.gemini import Gemini
-from llama_index.embeddings.gemini import GeminiEmbedding
+
+from data import EmbeddingCache, StorageHandler, SummaryCache, load_pdfs
+from engine import CachedGeminiEmbedding, CachedSelector, LazyQueryEngine, MatrixVectorStore, PrototypeSelector, SemanticCache, ShortQuerySelector, async_http_client, summarize_nodes
 
 # Application configuration
-CHUNK_SIZE = 1024
+# Chunk sizes are in tokens; embedding-001 accepts up to 2048 input tokens
+CHUNK_SIZE = 1800
+CHUNK_OVERLAP = 150
+LLM_MODEL = "models/gemini-1.5-pro"
+EMBED_MODEL = "models/embedding-001"
+# Gemini accepts at most 100 texts per batchEmbedContents request
+EMBED_BATCH_SIZE = 100
+INSERT_BATCH_SIZE = 512
+# Maximum number of embedding batches in flight while building the index
+EMBED_MAX_IN_FLIGHT = 16
+INDEX_CACHE_DIR = os.path.join(os.path.dirname(__file__), '.idx_cache')
+VECTOR_INDEX_ID = "vector"
+EMBEDDING_CACHE_PATH = os.path.join(INDEX_CACHE_DIR, 'embeddings.sqlite')
+SUMMARY_CACHE_PATH = os.path.join(INDEX_CACHE_DIR, 'summaries.sqlite')
+# Maximum number of chunk summary requests in flight
+SUMMARY_MAX_IN_FLIGHT = 8
+QUERY_CACHE_FILE = 'query_cache.pkl'
+STORAGE_PATH = os.path.join(INDEX_CACHE_DIR, 'storage.json')
+# Least recently used indexes beyond this many are deleted from disk
+INDEX_CACHE_MAX_ENTRIES = 32
+QUERY_CACHE_THRESHOLD = 0.95
+ROUTER_CACHE_THRESHOLD = 0.9
+VECTOR_TOP_K = 5
+# Questions with fewer words skip the LLM router unless they ask for a summary
+ROUTER_SHORT_QUERY_WORDS = 15
+# Example questions for the summary and vector tools, in tool order; the
+# router trusts the closest one when it wins by at least the margin
+SUMMARY_PROTOTYPES = (
+    "Summarize the overall content of these papers",
+    "Give an overview of the main ideas and contributions",
+    "Tóm tắt nội dung chính của tài liệu",
+)
+VECTOR_PROTOTYPES = (
+    "Find a specific detail or fact in the papers",
+    "What value or result does the paper report for this experiment",
+    "Tìm thông tin cụ thể trong tài liệu",
+)
+ROUTER_PROTOTYPE_MARGIN = 0.05
+# Background threads shared by all sessions for engine builds and chunk
+# summary jobs; each session runs at most one build at a time, so one user
+# cannot take over the pool
+ENGINE_BUILD_WORKERS = 8
+# Seconds between checks for a finished background build
+ENGINE_POLL_INTERVAL = 1.0
+# Worker count for parsing uploaded files; unset or 0 uses one per CPU
+LOAD_DOCUMENTS_WORKERS = int(os.getenv("LOAD_DOCUMENTS_NUMBER_OF_THREADS", "0")) or None
+# Number of most recent chat turns rendered outside the history expander
+CHAT_VISIBLE_TURNS = 20
 
 # Load external CSS
+@st.cache_resource
+def _css() -> str:
+    """Read Giaodien.css once per process and strip comments and whitespace."""
+    css_path = os.path.join(os.path.dirname(__file__), 'Giaodien.css')
+    with open(css_path, 'r', encoding='utf-8') as f:
+        css = re.sub(r'/\*.*?\*/', '', f.read(), flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{}:;,])\s*', r'\1', css)
+    return f'<style>{css.strip()}</style>'
+
 def load_css():
+    # Streamlit drops elements that are not re-emitted, so the style tag is
+    # sent on every rerun; only the file read and minification are cached
     try:
-        css_path = os.path.join(os.path.dirname(__file__), 'Giaodien.css')
-        with open(css_path, 'r', encoding='utf-8') as f:
-            st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+        st.markdown(_css(), unsafe_allow_html=True)
     except Exception as e:
         st.error(f"Failed to load CSS: {str(e)}")
 
@@ -44,92 +113,340 @@ def init_session_state():
         st.session_state.query_engine = None
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
-    if 'temp_dir' not in st.session_state:
-        st.session_state.temp_dir = None
+    if 'cache_key' not in st.session_state:
+        st.session_state.cache_key = None
+    if 'engine_future' not in st.session_state:
+        st.session_state.engine_future = None
+    if 'pending_cache_key' not in st.session_state:
+        st.session_state.pending_cache_key = None
+    # API key the current (or pending) query engine was built with
+    if 'engine_api_key' not in st.session_state:
+        st.session_state.engine_api_key = None
+    if 'pending_api_key' not in st.session_state:
+        st.session_state.pending_api_key = None
+    if 'qcache' not in st.session_state:
+        st.session_state.qcache = SemanticCache(threshold=QUERY_CACHE_THRESHOLD)
+    if 'file_digests' not in st.session_state:
+        st.session_state.file_digests = {}
+
+# Hash uploaded file contents
+def file_digest(uploaded_file) -> str:
+    """Return the SHA-256 hex digest of an uploaded file's contents."""
+    return hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+
+def upload_digests(uploaded_files) -> List[str]:
+    """Digest each upload once; Streamlit gives every new upload a fresh file_id."""
+    known = st.session_state.file_digests
+    digests = {f.file_id: known.get(f.file_id) or file_digest(f) for f in uploaded_files}
+    # Forget files that were removed from the uploader
+    st.session_state.file_digests = digests
+    return [digests[f.file_id] for f in uploaded_files]
+
+# Compute cache key for uploaded files
+def compute_cache_key(digests: List[str]) -> str:
+    """Hash uploaded file digests together with the indexing settings."""
+    key = hashlib.sha256(f"{EMBED_MODEL}:tokens:{CHUNK_SIZE}:{CHUNK_OVERLAP}".encode())
+    for digest in sorted(digests):
+        key.update(digest.encode())
+    return key.hexdigest()
 
 # Load documents function
-def load_documents(uploaded_files) -> List[Document]:
+def load_documents(uploaded_files, digests: List[str]) -> List[Document]:
     """Load documents from uploaded files."""
     try:
-        # Create temporary directory to store files
-        if st.session_state.temp_dir is None:
-            st.session_state.temp_dir = tempfile.TemporaryDirectory()
-        temp_dir = st.session_state.temp_dir.name
-        
-        # Save uploaded files to temporary directory
-        file_paths = []
-        for uploaded_file in uploaded_files:
-            file_path = os.path.join(temp_dir, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            file_paths.append(file_path)
-        
-        # Load documents from files
-        documents = SimpleDirectoryReader(input_files=file_paths).load_data()
-        return documents
+        # PDFs are parsed straight from the upload buffers, without writing
+        # them to disk first; the same file uploaded twice is parsed once
+        files = {}
+        for uploaded_file, digest in zip(uploaded_files, digests):
+            files[digest] = (uploaded_file.getbuffer(), uploaded_file.name)
+        return load_pdfs(list(files.values()), max_workers=LOAD_DOCUMENTS_WORKERS)
     except Exception as e:
         st.error(f"Error loading documents: {e}")
         return []
 
+# Shared embedding cache
+@st.cache_resource
+def get_embedding_cache() -> EmbeddingCache:
+    """Open the on-disk embedding cache once per process."""
+    return EmbeddingCache(EMBEDDING_CACHE_PATH)
+
+# Shared chunk summary cache
+@st.cache_resource
+def get_summary_cache() -> SummaryCache:
+    """Open the on-disk chunk summary cache once per process."""
+    return SummaryCache(SUMMARY_CACHE_PATH)
+
+# Cached index bookkeeping
+@st.cache_resource
+def get_storage_handler() -> StorageHandler:
+    """Open the storage file tracking cached indexes once per process."""
+    return StorageHandler(STORAGE_PATH)
+
+def track_cached_index(cache_key: str):
+    """Mark an index as used and delete the least recently used ones over the limit."""
+    handler = get_storage_handler()
+    handler.touch_index(cache_key)
+    for key in handler.evict_indexes(INDEX_CACHE_MAX_ENTRIES):
+        shutil.rmtree(os.path.join(INDEX_CACHE_DIR, key), ignore_errors=True)
+
+# Cached model and splitter constructors
+@st.cache_resource
+def get_llm(api_key: str) -> Gemini:
+    """Create the Gemini LLM once per API key."""
+    return Gemini(api_key=api_key, model=LLM_MODEL)
+
+@st.cache_resource
+def get_embed_model(api_key: str) -> CachedGeminiEmbedding:
+    """Create the Gemini embedding model once per API key."""
+    return CachedGeminiEmbedding(
+        cache=get_embedding_cache(),
+        api_key=api_key,
+        model_name=EMBED_MODEL,
+        embed_batch_size=EMBED_BATCH_SIZE,
+        num_workers=EMBED_MAX_IN_FLIGHT
+    )
+
+@st.cache_resource
+def get_router_selector(api_key: str) -> ShortQuerySelector:
+    """Create the router selector once per API key, sharing its decision cache."""
+    # Short specific questions go straight to the vector tool (index 1);
+    # the rest reuse earlier decisions, then try the example questions, and
+    # only ambiguous ones reach the LLM selector
+    embed_fn = get_embed_model(api_key).get_query_embedding
+    return ShortQuerySelector(
+        CachedSelector(
+            PrototypeSelector(
+                LLMSingleSelector.from_defaults(llm=get_llm(api_key)),
+                embed_fn=embed_fn,
+                prototypes=[SUMMARY_PROTOTYPES, VECTOR_PROTOTYPES],
+                margin=ROUTER_PROTOTYPE_MARGIN
+            ),
+            embed_fn=embed_fn,
+            threshold=ROUTER_CACHE_THRESHOLD
+        ),
+        default_index=1,
+        max_words=ROUTER_SHORT_QUERY_WORDS
+    )
+
+@st.cache_resource
+def get_splitter(chunk_size: int, chunk_overlap: int) -> TokenTextSplitter:
+    """Create the token splitter once per chunk size."""
+    return TokenTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        # Process-wide cl100k_base tiktoken encoder bundled with LlamaIndex
+        tokenizer=get_tokenizer()
+    )
+
 # Initialize models
 def initialize_models(api_key: str) -> bool:
     """Initialize LLM and embedding models."""
     try:
-        Settings.llm = Gemini(api_key=api_key, model="models/gemini-1.5-pro")
-        Settings.embed_model = GeminiEmbedding(api_key=api_key, model="models/embedding-001")
+        # The engine is built on worker threads, so the models are passed to
+        # it explicitly rather than through the process-wide Settings
+        get_llm(api_key)
+        get_embed_model(api_key)
+        Settings.chunk_size = CHUNK_SIZE
         return True
     except Exception as e:
         st.error(f"Error initializing models: {e}")
         return False
 
-# Create query engine
-def create_query_engine(documents: List[Document]) -> Optional[RouterQueryEngine]:
-    """Create and configure query engine."""
+# Load persisted index
+def load_cached_index(persist_dir: str, embed_model) -> Optional[VectorStoreIndex]:
+    """Load the vector index persisted under persist_dir, if any."""
+    if not os.path.isdir(persist_dir):
+        return None
+    try:
+        storage_context = StorageContext.from_defaults(
+            persist_dir=persist_dir,
+            vector_store=MatrixVectorStore.from_persist_dir(persist_dir)
+        )
+        return load_index_from_storage(
+            storage_context, index_id=VECTOR_INDEX_ID, embed_model=embed_model
+        )
+    except Exception as e:
+        print(f"Error loading cached index: {e}")
+        return None
+
+# Build and persist index
+def build_vector_index(nodes, persist_dir: str, embed_model) -> VectorStoreIndex:
+    """Build the vector index and persist it under persist_dir."""
+    vector_index = VectorStoreIndex(
+        nodes,
+        storage_context=StorageContext.from_defaults(vector_store=MatrixVectorStore()),
+        embed_model=embed_model,
+        insert_batch_size=INSERT_BATCH_SIZE
+    )
+    vector_index.set_index_id(VECTOR_INDEX_ID)
+    # Persist into a scratch directory and move it into place, so another
+    # session never loads a half-written cache entry
+    os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=INDEX_CACHE_DIR)
+    try:
+        vector_index.storage_context.persist(persist_dir=staging_dir)
+        # An entry that failed to load is replaced by the fresh build
+        shutil.rmtree(persist_dir, ignore_errors=True)
+        os.replace(staging_dir, persist_dir)
+    except Exception as e:
+        print(f"Error persisting index: {e}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return vector_index
+
+# Embed nodes
+async def embed_nodes(nodes, embed_model):
+    """Embed all nodes in one batched pass, sending each distinct chunk text once."""
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    unique_texts = list(dict.fromkeys(texts))
+    # All batches of the build share one connection pool, closed when done
+    async with async_http_client():
+        embeddings = await embed_model.aget_text_embedding_batch(unique_texts, show_progress=True)
+    by_text = dict(zip(unique_texts, embeddings))
+    for node, text in zip(nodes, texts):
+        node.embedding = by_text[text]
+
+# Summarize indexed chunks
+def summarize_index(vector_index: VectorStoreIndex, llm) -> List[TextNode]:
+    """Write (or load cached) summaries for every chunk in the vector index."""
+    nodes = list(vector_index.docstore.docs.values())
+    return asyncio_run(summarize_nodes(
+        nodes, llm, get_summary_cache(), max_in_flight=SUMMARY_MAX_IN_FLIGHT
+    ))
+
+def submit_summary_job(executor: ThreadPoolExecutor, vector_index: VectorStoreIndex, llm):
+    """Start the chunk summary job and return a function waiting for its result."""
+    future = executor.submit(summarize_index, vector_index, llm)
+
+    def wait_for_summaries() -> List[TextNode]:
+        nonlocal future
+        # A failed job is started again instead of raising the same error
+        # on every later summary question
+        if future.done() and future.exception() is not None:
+            future = executor.submit(summarize_index, vector_index, llm)
+        return future.result()
+
+    return wait_for_summaries
+
+# Build summary query engine
+def build_summary_query_engine(summary_nodes: List[TextNode], llm):
+    """Build a tree_summarize engine over per-chunk summaries."""
+    # Answering from short cached chunk summaries sends a fraction of the
+    # corpus tokens to the LLM on every summary question
+    return SummaryIndex(summary_nodes).as_query_engine(
+        llm=llm,
+        response_mode="tree_summarize",
+        use_async=True,
+        streaming=True
+    )
+
+# Build query engine
+def build_query_engine(
+    documents: List[Document],
+    cache_key: str,
+    llm: Gemini,
+    embed_model: CachedGeminiEmbedding,
+    selector: BaseSelector,
+    executor: ThreadPoolExecutor
+) -> RouterQueryEngine:
+    """Build the router query engine; safe to run outside the script thread."""
+    # Reuse the index persisted for the same files, otherwise build it
+    persist_dir = os.path.join(INDEX_CACHE_DIR, cache_key)
+    vector_index = load_cached_index(persist_dir, embed_model)
+    if vector_index is None:
+        # Parse documents into nodes
+        splitter = get_splitter(CHUNK_SIZE, CHUNK_OVERLAP)
+        nodes = splitter.get_nodes_from_documents(documents)
+        
+        # Create index; nodes already carry embeddings, so building it only
+        # fills the vector store
+        asyncio.run(embed_nodes(nodes, embed_model))
+        vector_index = build_vector_index(nodes, persist_dir, embed_model)
+    
+    # Chunk summaries are written by a follow-up background job, so the
+    # vector tool answers as soon as the index is ready; a summary question
+    # asked before the job finishes waits for it
+    wait_for_summaries = submit_summary_job(executor, vector_index, llm)
+    summary_query_engine = LazyQueryEngine(
+        lambda: build_summary_query_engine(wait_for_summaries(), llm)
+    )
+    vector_query_engine = vector_index.as_query_engine(
+        llm=llm,
+        similarity_top_k=VECTOR_TOP_K,
+        streaming=True
+    )
+    
+    # Create tools
+    summary_tool = QueryEngineTool.from_defaults(
+        query_engine=summary_query_engine,
+        description="Useful for summary questions related to any topic in deep learning papers."
+    )
+    vector_tool = QueryEngineTool.from_defaults(
+        query_engine=vector_query_engine,
+        description="Useful for retrieving specific information from deep learning papers."
+    )
+    
+    # Create router query engine
+    return RouterQueryEngine(
+        selector=selector,
+        query_engine_tools=[summary_tool, vector_tool],
+        llm=llm,
+        verbose=True
+    )
+
+# Background executor for engine builds
+@st.cache_resource
+def get_engine_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all sessions for engine builds and summary jobs."""
+    return ThreadPoolExecutor(max_workers=ENGINE_BUILD_WORKERS, thread_name_prefix="engine-build")
+
+# Start building query engine
+def start_query_engine_build(documents: List[Document], cache_key: str):
+    """Build the query engine in the background so the user can start typing."""
+    st.session_state.query_engine = None
+    st.session_state.pending_cache_key = cache_key
+    st.session_state.pending_api_key = api_key = st.session_state.api_key
+    executor = get_engine_executor()
+    st.session_state.engine_future = executor.submit(
+        build_query_engine, documents, cache_key,
+        get_llm(api_key), get_embed_model(api_key),
+        get_router_selector(api_key),
+        executor
+    )
+
+# Collect the background build
+def resolve_query_engine(wait: bool = False) -> Optional[RouterQueryEngine]:
+    """Install the background-built engine once it is ready (optionally waiting)."""
+    state = st.session_state
+    future = state.engine_future
+    if future is None or (not wait and not future.done()):
+        return state.query_engine
+    cache_key, api_key = state.pending_cache_key, state.pending_api_key
+    state.engine_future = None
+    state.pending_cache_key = state.pending_api_key = None
     try:
         with st.spinner("Processing documents..."):
-            progress_bar = st.progress(0)
-            
-            # Parse documents into nodes
-            splitter = SentenceSplitter(chunk_size=CHUNK_SIZE)
-            nodes = splitter.get_nodes_from_documents(documents)
-            progress_bar.progress(0.3)
-            
-            # Create indices
-            summary_index = SummaryIndex(nodes)
-            progress_bar.progress(0.5)
-            vector_index = VectorStoreIndex(nodes)
-            progress_bar.progress(0.7)
-            
-            # Create query engines
-            summary_query_engine = summary_index.as_query_engine(
-                response_mode="tree_summarize",
-                use_async=True
-            )
-            vector_query_engine = vector_index.as_query_engine()
-            progress_bar.progress(0.9)
-            
-            # Create tools
-            summary_tool = QueryEngineTool.from_defaults(
-                query_engine=summary_query_engine,
-                description="Useful for summary questions related to any topic in deep learning papers."
-            )
-            vector_tool = QueryEngineTool.from_defaults(
-                query_engine=vector_query_engine,
-                description="Useful for retrieving specific information from deep learning papers."
-            )
-            
-            # Create router query engine
-            query_engine = RouterQueryEngine(
-                selector=LLMSingleSelector.from_defaults(),
-                query_engine_tools=[summary_tool, vector_tool],
-                verbose=True
-            )
-            
-            progress_bar.progress(1.0)
-            return query_engine
+            state.query_engine = future.result()
     except Exception as e:
         st.error(f"Error creating query engine: {e}")
         return None
+    state.cache_key = cache_key
+    state.engine_api_key = api_key
+    track_cached_index(cache_key)
+    state.qcache = SemanticCache.load(
+        os.path.join(INDEX_CACHE_DIR, cache_key, QUERY_CACHE_FILE),
+        threshold=QUERY_CACHE_THRESHOLD
+    )
+    return state.query_engine
+
+# Rerun once the background build finishes
+@st.fragment(run_every=ENGINE_POLL_INTERVAL)
+def watch_engine_build():
+    """Poll the background build and rerun the app when it completes."""
+    # The fragment is only rendered while a build is pending, so polling
+    # stops after the rerun that installs the engine or shows its error
+    future = st.session_state.engine_future
+    if future is not None and future.done():
+        st.rerun()
 
 # Process query
 def process_query(query: str):
@@ -138,45 +455,101 @@ def process_query(query: str):
         st.warning("Please enter a question.")
         return
     
-    if st.session_state.query_engine is None:
+    # Wait for the remainder of a background engine build, if one is running
+    if resolve_query_engine(wait=True) is None:
         st.warning("Please load documents and initialize models first.")
         return
     
+    state = st.session_state
+    qcache = state.qcache
     try:
+        # The spinner only covers routing and retrieval, up to the first token
+        placeholder = st.empty()
         with st.spinner("Processing question..."):
-            response = st.session_state.query_engine.query(query)
-            # Add to chat history
-            st.session_state.chat_history.append({"question": query, "answer": str(response)})
+            # Answer from the semantic cache when a similar question was already asked
+            embed_model = get_embed_model(state.engine_api_key)
+            query_embedding = embed_model.get_query_embedding(query)
+            answer = qcache.lookup(query_embedding)
+            response = None
+            if answer is None:
+                # Pass the embedding along so the router and retriever reuse it
+                response = state.query_engine.query(
+                    QueryBundle(query, embedding=query_embedding)
+                )
+        if response is not None:
+            # Render tokens into the placeholder as they arrive
+            if hasattr(response, "response_gen"):
+                answer = ""
+                for token in response.response_gen:
+                    answer += token
+                    placeholder.markdown(answer)
+            else:
+                answer = str(response)
+            qcache.add(query_embedding, answer)
+            qcache.save()
+        placeholder.markdown(answer)
+        # Add to chat history
+        state.chat_history.append({
+            "question": query,
+            "answer": answer,
+            "html": render_chat_turn(query, answer)
+        })
     except Exception as e:
         st.error(f"Error processing query: {e}")
 
 # Handle chat input
+def submit_chat_input():
+    """Queue the submitted question and clear the input box."""
+    st.session_state.pending_query = st.session_state.chat_input
+    st.session_state.chat_input = ""
+
 def handle_input():
-    chat_input = st.text_input("", 
-                              key="chat_input", 
-                              placeholder="Send a message...",
-                              label_visibility="collapsed")
+    st.text_input("", 
+                  key="chat_input", 
+                  placeholder="Send a message...",
+                  label_visibility="collapsed",
+                  on_change=submit_chat_input)
+    # Only a newly submitted question is answered; reruns (such as the one
+    # after a background build) find nothing queued
+    chat_input = st.session_state.pop("pending_query", None)
     if chat_input:
         process_query(chat_input)
 
+# Chat message markup
+# Kept flush-left: after a blank line in an answer, indented HTML would
+# otherwise be rendered as a markdown code block
+CHAT_TURN_TEMPLATE = (
+    "<div class='message-container fade-in'>\n"
+    "<div class='user-message'><div class='avatar'>👤</div>"
+    "<div class='message-content'>{question}</div></div>\n"
+    "<div class='ai-message'><div class='avatar'>🤖</div>"
+    "<div class='message-content'>{answer}</div></div>\n"
+    "</div>\n"
+)
+
+def render_chat_turn(question: str, answer: str) -> str:
+    """Render one question and answer as chat message HTML."""
+    return CHAT_TURN_TEMPLATE.format(question=question, answer=answer)
+
+def render_chat_html(turns) -> str:
+    """Join the HTML rendered for each turn when it was added."""
+    return "".join(
+        chat.get('html') or render_chat_turn(chat['question'], chat['answer'])
+        for chat in turns
+    )
+
 # Main chat interface
 def display_chat():
     st.markdown("<div class='chat-container'>", unsafe_allow_html=True)
     
-    if st.session_state.chat_history:
-        for chat in st.session_state.chat_history:
-            st.markdown(f"""
-                <div class='message-container fade-in'>
-                    <div class='user-message'>
-                        <div class='avatar'>👤</div>
-                        <div class='message-content'>{chat['question']}</div>
-                    </div>
-                    <div class='ai-message'>
-                        <div class='avatar'>🤖</div>
-                        <div class='message-content'>{chat['answer']}</div>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
+    chat_history = st.session_state.chat_history
+    if chat_history:
+        # Older turns stay collapsed; each group is sent as one markdown element
+        older, recent = chat_history[:-CHAT_VISIBLE_TURNS], chat_history[-CHAT_VISIBLE_TURNS:]
+        if older:
+            with st.expander(f"Earlier messages ({len(older)})", expanded=False):
+                st.markdown(render_chat_html(older), unsafe_allow_html=True)
+        st.markdown(render_chat_html(recent), unsafe_allow_html=True)
 
     with st.container():
         st.markdown("<div class='input-container'>", unsafe_allow_html=True)
@@ -189,15 +562,16 @@ def main():
     
     # Initialize session state
     init_session_state()
+    state = st.session_state
     
     # Sidebar for configuration
     with st.sidebar:
         st.markdown("<div class='sub-header'>Configuration</div>", unsafe_allow_html=True)
         
         # API key input
-        api_key = st.text_input("Gemini API Key", value=st.session_state.api_key, type="password")
-        if api_key != st.session_state.api_key:
-            st.session_state.api_key = api_key
+        api_key = st.text_input("Gemini API Key", value=state.api_key, type="password")
+        if api_key != state.api_key:
+            state.api_key = api_key
         
         # Upload documents
         st.markdown("### Upload Documents")
@@ -205,20 +579,31 @@ def main():
         
         if uploaded_files:
             if st.button("Process Documents"):
-                documents = load_documents(uploaded_files)
-                if documents:
-                    st.session_state.documents = documents
-                    st.success(f"Successfully loaded {len(documents)} documents!")
-                    
-                    # Initialize model and query engine
-                    if initialize_models(st.session_state.api_key):
-                        st.session_state.query_engine = create_query_engine(documents)
-                        if st.session_state.query_engine:
-                            st.success("Successfully initialized models and query engine!")
+                digests = upload_digests(uploaded_files)
+                cache_key = compute_cache_key(digests)
+                # An engine only counts as unchanged when it was built with
+                # the current API key; a replaced key always rebuilds
+                if (cache_key, state.api_key) == (state.pending_cache_key, state.pending_api_key):
+                    st.info("These documents are already being processed.")
+                elif state.engine_future is not None and not state.engine_future.done():
+                    # One build per session keeps the shared pool free for others
+                    st.info("Other documents are still being processed, please try again once they are ready.")
+                elif (cache_key, state.api_key) == (state.cache_key, state.engine_api_key) and state.query_engine is not None:
+                    st.success("Documents unchanged, reusing existing query engine!")
+                else:
+                    documents = load_documents(uploaded_files, digests)
+                    if documents:
+                        state.documents = documents
+                        st.success(f"Successfully loaded {len(documents)} documents!")
+                        
+                        # Initialize model and query engine
+                        if initialize_models(state.api_key):
+                            start_query_engine_build(documents, cache_key)
+                            st.success("Building the query engine in the background, you can start asking!")
         
         # Clear chat history
         if st.button("Clear Chat History"):
-            st.session_state.chat_history = []
+            state.chat_history = []
             st.success("Chat history cleared!")
 
     # Main application section
@@ -226,8 +611,13 @@ def main():
     st.markdown("<div class='sub-header text-center text-white'>Smart Assistant for Scientific Research</div>", unsafe_allow_html=True)
 
     # Display status
-    if st.session_state.documents is not None:
-        st.info(f"Loaded {len(st.session_state.documents)} documents. Ready to answer questions!")
+    resolve_query_engine()
+    documents = state.documents
+    if state.engine_future is not None:
+        st.info(f"Loaded {len(documents)} documents. Building the query engine...")
+        watch_engine_build()
+    elif documents is not None:
+        st.info(f"Loaded {len(documents)} documents. Ready to answer questions!")
     else:
         st.info("Please upload PDF documents from the sidebar to begin.")
 
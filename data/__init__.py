@@ -1,3 +1,6 @@
+from .document_loader import load_pdf, load_pdfs
+from .embedding_cache import EmbeddingCache
 from .storage_handler import StorageHandler
+from .summary_cache import SummaryCache
 
-__all__ = ['StorageHandler']
+__all__ = ['EmbeddingCache', 'StorageHandler', 'SummaryCache', 'load_pdf', 'load_pdfs']
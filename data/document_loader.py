@@ -0,0 +1,63 @@
+import io
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from llama_index.core import Document
+from pypdf import PdfReader
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(max_workers):
+    """Return the process pool with max_workers workers, created on first use."""
+    with _pools_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            # Forking the threaded server could copy locks other threads hold,
+            # so workers come from a forkserver (or spawn where it is missing)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = _pools[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context(method)
+            )
+        return pool
+
+def load_pdf(data, file_name):
+    """Parse PDF bytes into one document per page, like LlamaIndex's PDFReader."""
+    reader = PdfReader(io.BytesIO(data))
+    documents = []
+    for page, page_label in zip(reader.pages, reader.page_labels):
+        document = Document(
+            text=page.extract_text() or "",
+            metadata={"page_label": page_label, "file_name": file_name}
+        )
+        # As with SimpleDirectoryReader, the file name stays out of the text
+        # sent to the embedding model and the LLM
+        document.excluded_embed_metadata_keys = ["file_name"]
+        document.excluded_llm_metadata_keys = ["file_name"]
+        documents.append(document)
+    return documents
+
+def load_pdfs(files, max_workers=None):
+    """Parse (data, file_name) pairs of in-memory PDFs, one worker process per file.
+
+    The worker processes are started once and reused by later calls.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if min(max_workers, len(files)) <= 1:
+        return list(itertools.chain.from_iterable(load_pdf(data, name) for data, name in files))
+    # Buffers are copied to bytes so they can be sent to the workers
+    datas = [bytes(data) for data, _ in files]
+    names = [name for _, name in files]
+    pool = _get_pool(max_workers)
+    try:
+        return list(itertools.chain.from_iterable(pool.map(load_pdf, datas, names)))
+    except BrokenProcessPool:
+        # A worker died; the next call starts a fresh pool
+        with _pools_lock:
+            if _pools.get(max_workers) is pool:
+                del _pools[max_workers]
+        raise
@@ -0,0 +1,49 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+
+# SQLite limits the number of bound parameters per statement
+_MAX_QUERY_KEYS = 500
+
+class EmbeddingCache:
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS emb_cache ("
+                "text_hash TEXT NOT NULL, model TEXT NOT NULL, vec BLOB NOT NULL, "
+                "PRIMARY KEY (text_hash, model))"
+            )
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, hashes, model):
+        """Return a {text_hash: embedding} dict for the hashes found in the cache."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), _MAX_QUERY_KEYS):
+                batch = unique[start:start + _MAX_QUERY_KEYS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vec FROM emb_cache WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                )
+                for text_hash, vec in rows:
+                    found[text_hash] = array('f', vec).tolist()
+        return found
+
+    def put_many(self, items, model):
+        """Store (text_hash, embedding) pairs for the given model."""
+        rows = [(text_hash, model, array('f', embedding).tobytes()) for text_hash, embedding in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO emb_cache (text_hash, model, vec) VALUES (?, ?, ?)",
+                rows,
+            )
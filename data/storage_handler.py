@@ -1,37 +1,176 @@
+import atexit
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
-class StorageHandler:
-    def __init__(self):
-        self.storage_path = os.path.join(os.path.dirname(__file__), 'storage.json')
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-    def save_data(self, data):
-        try:
-            storage = self.read_storage()
-            storage['entries'].append({
-                **data,
-                'timestamp': datetime.now().isoformat()
-            })
-            storage['lastUpdated'] = datetime.now().isoformat()
-            
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(storage, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"Error saving data: {e}")
-            return False
+# Queued entries are written in batches of up to this many, at most this
+# many seconds after the first one of a batch was queued
+FLUSH_BATCH_SIZE = 32
+FLUSH_INTERVAL = 0.5
 
-    def read_storage(self):
+def _dumps(obj) -> bytes:
+    """Serialize to UTF-8 JSON; datetimes are written as ISO 8601 strings."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, default=datetime.isoformat).encode('utf-8')
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+class StorageHandler:
+    def __init__(self, storage_path=None):
+        self.storage_path = storage_path or os.path.join(os.path.dirname(__file__), 'storage.json')
+        # Entries are appended one JSON object per line next to storage.json,
+        # so saving an entry never rewrites the ones before it
+        self.entries_path = os.path.splitext(self.storage_path)[0] + '.entries.jsonl'
+        self._lock = threading.Lock()
+        # save_data only queues entries; a daemon thread appends them to the log
+        self._queue = queue.Queue()
+        # Entries the writer thread failed to write since the last flush()
+        self._lost = 0
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        atexit.register(self.flush)
+
+    def _read_meta(self):
         try:
-            with open(self.storage_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(self.storage_path, 'rb') as f:
+                return _loads(f.read())
         except:
             return {
-                "entries": [],
+                "indexes": {},
                 "lastUpdated": None,
                 "metadata": {
                     "version": "1.0",
                     "description": "Data storage for AI web application"
                 }
             }
+
+    def _write_meta(self, storage):
+        storage['lastUpdated'] = datetime.now()
+        os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
+        with open(self.storage_path, 'wb') as f:
+            f.write(_dumps(storage))
+
+    def _read_entries(self):
+        entries = []
+        try:
+            with open(self.entries_path, 'rb') as f:
+                for line in f:
+                    try:
+                        entries.append(_loads(line))
+                    except ValueError:
+                        # Blank or partially written line
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _write_entries(self, entries):
+        lines = []
+        for entry in entries:
+            try:
+                lines.append(_dumps(entry) + b'\n')
+            except Exception as e:
+                print(f"Error saving data: {e}")
+        lost = len(entries) - len(lines)
+        if lines:
+            try:
+                with self._lock:
+                    os.makedirs(os.path.dirname(self.entries_path), exist_ok=True)
+                    with open(self.entries_path, 'ab') as f:
+                        f.write(b''.join(lines))
+            except Exception as e:
+                print(f"Error saving data: {e}")
+                lost = len(entries)
+        if lost:
+            with self._lock:
+                self._lost += lost
+
+    def _flush_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < FLUSH_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._write_entries(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued entry has been handled and return how many
+        could not be written since the previous flush()."""
+        self._queue.join()
+        with self._lock:
+            lost, self._lost = self._lost, 0
+        return lost
+
+    def save_data(self, data):
+        """Queue an entry to be appended to the log in the background.
+
+        Saving is fire-and-forget: True only means the entry was queued.
+        Entries that later fail to serialize or write are reported by flush().
+        """
+        self._queue.put({
+            **data,
+            'timestamp': datetime.now()
+        })
+        return True
+
+    def touch_index(self, key):
+        """Record that the cached index stored under key was just used."""
+        try:
+            with self._lock:
+                storage = self._read_meta()
+                storage.setdefault('indexes', {})[key] = {'lastUsed': datetime.now()}
+                self._write_meta(storage)
+            return True
+        except Exception as e:
+            print(f"Error tracking index: {e}")
+            return False
+
+    def evict_indexes(self, max_entries):
+        """Forget all but the max_entries most recently used indexes and return the evicted keys."""
+        try:
+            with self._lock:
+                storage = self._read_meta()
+                indexes = storage.get('indexes', {})
+                by_age = sorted(indexes, key=lambda key: indexes[key]['lastUsed'], reverse=True)
+                evicted = by_age[max_entries:]
+                if evicted:
+                    for key in evicted:
+                        del indexes[key]
+                    self._write_meta(storage)
+            return evicted
+        except Exception as e:
+            print(f"Error evicting indexes: {e}")
+            return []
+
+    def read_storage(self):
+        # Wait for queued entries without consuming the count flush() reports
+        self._queue.join()
+        with self._lock:
+            storage = self._read_meta()
+            try:
+                entries = self._read_entries()
+            except Exception as e:
+                print(f"Error reading entries: {e}")
+                entries = []
+        # Entries from files written before the JSONL log come first
+        storage['entries'] = storage.get('entries', []) + entries
+        if entries and (storage.get('lastUpdated') or '') < entries[-1]['timestamp']:
+            storage['lastUpdated'] = entries[-1]['timestamp']
+        return storage
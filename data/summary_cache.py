@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+
+# SQLite limits the number of bound parameters per statement
+_MAX_QUERY_KEYS = 500
+
+class SummaryCache:
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summary_cache ("
+                "text_hash TEXT NOT NULL, model TEXT NOT NULL, summary TEXT NOT NULL, "
+                "PRIMARY KEY (text_hash, model))"
+            )
+
+    def get_many(self, hashes, model):
+        """Return a {text_hash: summary} dict for the hashes found in the cache."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), _MAX_QUERY_KEYS):
+                batch = unique[start:start + _MAX_QUERY_KEYS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, summary FROM summary_cache WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, items, model):
+        """Store (text_hash, summary) pairs for the given model."""
+        rows = [(text_hash, model, summary) for text_hash, summary in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO summary_cache (text_hash, model, summary) VALUES (?, ?, ?)",
+                rows,
+            )
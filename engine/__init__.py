@@ -0,0 +1,8 @@
+from .chunk_summaries import summarize_nodes
+from .embeddings import CachedGeminiEmbedding, async_http_client
+from .lazy_query_engine import LazyQueryEngine
+from .selectors import CachedSelector, PrototypeSelector, ShortQuerySelector
+from .semantic_cache import SemanticCache
+from .vector_store import MatrixVectorStore
+
+__all__ = ['CachedGeminiEmbedding', 'CachedSelector', 'LazyQueryEngine', 'MatrixVectorStore', 'PrototypeSelector', 'SemanticCache', 'ShortQuerySelector', 'async_http_client', 'summarize_nodes']
@@ -0,0 +1,64 @@
+import asyncio
+import random
+from typing import List, Sequence
+
+from llama_index.core.llms import LLM
+from llama_index.core.schema import BaseNode, MetadataMode, NodeRelationship, TextNode
+
+from data import EmbeddingCache, SummaryCache
+
+from .embeddings import MAX_RETRIES, RETRY_BASE_DELAY
+
+CHUNK_SUMMARY_PROMPT = (
+    "Summarize the following excerpt of a document in two or three sentences. "
+    "Keep its key terms, methods and results.\n\n{text}"
+)
+
+async def summarize_nodes(
+    nodes: Sequence[BaseNode],
+    llm: LLM,
+    cache: SummaryCache,
+    max_in_flight: int = 8,
+) -> List[TextNode]:
+    """Return a summary node for every node, only calling the LLM for chunks not summarized before.
+
+    Summaries are cached by chunk text hash and stored as soon as each one
+    arrives, so an interrupted run resumes where it stopped. A chunk whose
+    request keeps failing is represented by its own text, uncached, so the
+    other summaries are still returned and the next run tries it again.
+    """
+    model = llm.metadata.model_name
+    texts = [node.get_content(metadata_mode=MetadataMode.NONE) for node in nodes]
+    hashes = [EmbeddingCache.text_hash(text) for text in texts]
+    summaries = cache.get_many(hashes, model)
+    misses = {h: text for h, text in zip(hashes, texts) if h not in summaries}
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def summarize(text_hash: str, text: str):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with semaphore:
+                    response = await llm.acomplete(CHUNK_SUMMARY_PROMPT.format(text=text))
+                break
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    print(f"Error summarizing chunk: {e}")
+                    summaries[text_hash] = text
+                    return
+            # Back off outside the semaphore so other chunks keep going
+            await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt * random.uniform(1.0, 1.5))
+        summary = response.text.strip()
+        cache.put_many([(text_hash, summary)], model)
+        summaries[text_hash] = summary
+
+    await asyncio.gather(*(summarize(h, text) for h, text in misses.items()))
+    return [
+        TextNode(
+            text=summaries[h],
+            metadata=dict(node.metadata),
+            excluded_llm_metadata_keys=list(node.excluded_llm_metadata_keys),
+            excluded_embed_metadata_keys=list(node.excluded_embed_metadata_keys),
+            relationships={NodeRelationship.SOURCE: node.as_related_node_info()},
+        )
+        for node, h in zip(nodes, hashes)
+    ]
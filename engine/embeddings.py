@@ -0,0 +1,205 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+import httpx
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.gemini import GeminiEmbedding
+
+from data import EmbeddingCache
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+# Gemini accepts at most 100 texts per batchEmbedContents request
+GEMINI_MAX_BATCH = 100
+HTTP_TIMEOUT = 60.0
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+QUERY_CACHE_SIZE = 1024
+# Rate-limited and transiently failing requests are retried with jittered
+# exponential backoff, honouring Retry-After when Gemini sends it
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+# Concurrent batches start spread over this many seconds instead of on one tick
+START_JITTER = 0.05
+
+_sync_client = None
+_sync_client_lock = threading.Lock()
+# Async clients are bound to the event loop they were opened on, so each
+# async block (an index build, a single query) opens and closes its own
+_async_client = contextvars.ContextVar("gemini_async_client", default=None)
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide HTTP/2 client used for Gemini REST calls."""
+    global _sync_client
+    if _sync_client is None:
+        with _sync_client_lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+    return _sync_client
+
+@asynccontextmanager
+async def async_http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Share one HTTP/2 async client between the requests made inside the block.
+
+    Nested blocks and tasks started inside it reuse the outer client, which
+    is closed, together with its connections, when the outermost block exits.
+    """
+    client = _async_client.get()
+    if client is not None:
+        yield client
+        return
+    async with httpx.AsyncClient(http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS) as client:
+        token = _async_client.set(client)
+        try:
+            yield client
+        finally:
+            _async_client.reset(token)
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    try:
+        delay = float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        delay = RETRY_BASE_DELAY * 2 ** attempt
+    return delay * random.uniform(1.0, 1.5)
+
+def _post(client: httpx.Client, url: str, headers: dict, body: dict) -> httpx.Response:
+    for attempt in range(MAX_RETRIES + 1):
+        response = client.post(url, headers=headers, json=body)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        time.sleep(_retry_delay(response, attempt))
+
+async def _apost(client: httpx.AsyncClient, url: str, headers: dict, body: dict) -> httpx.Response:
+    await asyncio.sleep(random.uniform(0, START_JITTER))
+    for attempt in range(MAX_RETRIES + 1):
+        response = await client.post(url, headers=headers, json=body)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        await asyncio.sleep(_retry_delay(response, attempt))
+
+class CachedGeminiEmbedding(GeminiEmbedding):
+    """Gemini embedding model backed by a persistent per-chunk cache.
+
+    Cache misses are sent straight to the batchEmbedContents REST endpoint
+    over pooled HTTP/2 connections instead of through google-generativeai.
+    Query embeddings are kept in an in-memory LRU keyed by normalized text.
+    """
+
+    _cache: EmbeddingCache = PrivateAttr()
+    _query_cache: OrderedDict = PrivateAttr()
+    _query_cache_lock: threading.Lock = PrivateAttr()
+
+    def __init__(self, cache: EmbeddingCache, **kwargs):
+        super().__init__(**kwargs)
+        self._cache = cache
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedGeminiEmbedding"
+
+    def _split_cached(self, texts: List[str]):
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        cached = self._cache.get_many(hashes, self.model_name)
+        misses = list({h: text for h, text in zip(hashes, texts) if h not in cached}.items())
+        return hashes, cached, misses
+
+    def _merge(self, hashes, cached, misses, fresh):
+        new_items = [(h, embedding) for (h, _), embedding in zip(misses, fresh)]
+        if new_items:
+            self._cache.put_many(new_items, self.model_name)
+            cached.update(new_items)
+        return [cached[h] for h in hashes]
+
+    def _batch_requests(self, texts: List[str]):
+        """Yield (url, headers, body) for batchEmbedContents calls covering texts."""
+        url = f"{GEMINI_API_BASE}/{self.model_name}:batchEmbedContents"
+        headers = {"x-goog-api-key": self.api_key or os.getenv("GOOGLE_API_KEY", "")}
+        for start in range(0, len(texts), GEMINI_MAX_BATCH):
+            requests = []
+            for text in texts[start:start + GEMINI_MAX_BATCH]:
+                request = {"model": self.model_name, "content": {"parts": [{"text": text}]}}
+                if self.task_type:
+                    request["taskType"] = self.task_type.upper()
+                if self.title:
+                    request["title"] = self.title
+                requests.append(request)
+            yield url, headers, {"requests": requests}
+
+    @staticmethod
+    def _parse_embeddings(response: httpx.Response) -> List[List[float]]:
+        response.raise_for_status()
+        return [item["values"] for item in response.json()["embeddings"]]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        client = get_http_client()
+        embeddings = []
+        for url, headers, body in self._batch_requests(texts):
+            embeddings.extend(self._parse_embeddings(_post(client, url, headers, body)))
+        return embeddings
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        async with async_http_client() as client:
+            responses = await asyncio.gather(*(
+                _apost(client, url, headers, body)
+                for url, headers, body in self._batch_requests(texts)
+            ))
+        return [embedding for response in responses for embedding in self._parse_embeddings(response)]
+
+    @staticmethod
+    def _query_key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _cached_query(self, key: str):
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+            return embedding
+
+    def _remember_query(self, key: str, embedding: List[float]):
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            while len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        """Get query embedding, reusing it for repeated questions."""
+        key = self._query_key(query)
+        embedding = self._cached_query(key)
+        if embedding is None:
+            embedding = self._embed_batch([query])[0]
+            self._remember_query(key, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        """Asynchronously get query embedding, reusing it for repeated questions."""
+        key = self._query_key(query)
+        embedding = self._cached_query(key)
+        if embedding is None:
+            embedding = (await self._aembed_batch([query]))[0]
+            self._remember_query(key, embedding)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        """Get text embedding, consulting the cache first."""
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get text embeddings, only calling Gemini for uncached texts."""
+        hashes, cached, misses = self._split_cached(texts)
+        fresh = self._embed_batch([text for _, text in misses]) if misses else []
+        return self._merge(hashes, cached, misses, fresh)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Asynchronously get text embeddings, only calling Gemini for uncached texts."""
+        hashes, cached, misses = self._split_cached(texts)
+        fresh = await self._aembed_batch([text for _, text in misses]) if misses else []
+        return self._merge(hashes, cached, misses, fresh)
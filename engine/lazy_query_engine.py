@@ -0,0 +1,38 @@
+import threading
+from typing import Callable, Optional
+
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import RESPONSE_TYPE
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.prompts.mixin import PromptMixinType
+from llama_index.core.schema import QueryBundle
+
+class LazyQueryEngine(BaseQueryEngine):
+    """Query engine that builds its wrapped engine on the first query."""
+
+    def __init__(
+        self,
+        factory: Callable[[], BaseQueryEngine],
+        callback_manager: Optional[CallbackManager] = None,
+    ):
+        self._factory = factory
+        self._engine: Optional[BaseQueryEngine] = None
+        self._lock = threading.Lock()
+        super().__init__(callback_manager=callback_manager)
+
+    @property
+    def engine(self) -> BaseQueryEngine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._factory()
+        return self._engine
+
+    def _get_prompt_modules(self) -> PromptMixinType:
+        return {}
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        return self.engine.query(query_bundle)
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        return await self.engine.aquery(query_bundle)
@@ -0,0 +1,225 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.base_selector import BaseSelector, SelectorResult, SingleSelection
+from llama_index.core.prompts.mixin import PromptDictType, PromptMixinType
+from llama_index.core.schema import QueryBundle
+from llama_index.core.tools.types import ToolMetadata
+
+# Words that mark a question as asking for a summary (English and Vietnamese)
+SUMMARY_KEYWORDS = ("summary", "summarize", "summarise", "overview", "tóm tắt", "tổng quát", "tổng quan")
+
+def _normalize(embedding) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+class CachedSelector(BaseSelector):
+    """Selector that reuses earlier decisions for semantically similar queries.
+
+    A repeated question (after case and whitespace normalization) is
+    answered from an exact-match table without embedding it. Otherwise the
+    query embedding is compared against a bounded LRU of previous queries;
+    on a close enough match the stored decision is returned without calling
+    the wrapped (LLM) selector.
+    """
+
+    def __init__(
+        self,
+        selector: BaseSelector,
+        embed_fn: Callable[[str], List[float]],
+        threshold: float = 0.9,
+        max_entries: int = 256,
+    ):
+        self._selector = selector
+        self._embed_fn = embed_fn
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._exact: dict = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def _get_prompt_modules(self) -> PromptMixinType:
+        return {"selector": self._selector}
+
+    def _get_prompts(self) -> PromptDictType:
+        return {}
+
+    def _update_prompts(self, prompts: PromptDictType) -> None:
+        pass
+
+    def _query_embedding(self, query: QueryBundle) -> np.ndarray:
+        if query.embedding is None:
+            query.embedding = self._embed_fn(query.query_str)
+        return _normalize(query.embedding)
+
+    @staticmethod
+    def _exact_key(signature: tuple, query: QueryBundle) -> tuple:
+        return signature, " ".join(query.query_str.lower().split())
+
+    def _lookup_exact(self, exact_key: tuple) -> Optional[SelectorResult]:
+        with self._lock:
+            key = self._exact.get(exact_key)
+            if key is None:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][2]
+
+    def _lookup(self, signature: tuple, embedding: np.ndarray) -> Optional[SelectorResult]:
+        with self._lock:
+            candidates = [(key, emb) for key, (sig, emb, _, _) in self._entries.items() if sig == signature]
+            if not candidates:
+                return None
+            sims = np.stack([emb for _, emb in candidates]) @ embedding
+            best = int(np.argmax(sims))
+            if sims[best] < self._threshold:
+                return None
+            key = candidates[best][0]
+            self._entries.move_to_end(key)
+            return self._entries[key][2]
+
+    def _insert(self, exact_key: tuple, embedding: np.ndarray, result: SelectorResult):
+        with self._lock:
+            self._entries[self._next_key] = (exact_key[0], embedding, result, exact_key)
+            self._exact[exact_key] = self._next_key
+            self._next_key += 1
+            while len(self._entries) > self._max_entries:
+                evicted, (_, _, _, evicted_exact) = self._entries.popitem(last=False)
+                if self._exact.get(evicted_exact) == evicted:
+                    del self._exact[evicted_exact]
+
+    def _select(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        signature = tuple(choice.description for choice in choices)
+        exact_key = self._exact_key(signature, query)
+        result = self._lookup_exact(exact_key)
+        if result is not None:
+            return result
+        embedding = self._query_embedding(query)
+        result = self._lookup(signature, embedding)
+        if result is None:
+            result = self._selector.select(choices, query)
+        self._insert(exact_key, embedding, result)
+        return result
+
+    async def _aselect(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        signature = tuple(choice.description for choice in choices)
+        exact_key = self._exact_key(signature, query)
+        result = self._lookup_exact(exact_key)
+        if result is not None:
+            return result
+        embedding = self._query_embedding(query)
+        result = self._lookup(signature, embedding)
+        if result is None:
+            result = await self._selector.aselect(choices, query)
+        self._insert(exact_key, embedding, result)
+        return result
+
+class ShortQuerySelector(BaseSelector):
+    """Selector that routes short, specific questions without calling the LLM.
+
+    Questions shorter than max_words words that contain none of the summary
+    keywords go straight to the choice at default_index; everything else is
+    passed on to the wrapped selector.
+    """
+
+    def __init__(
+        self,
+        selector: BaseSelector,
+        default_index: int,
+        max_words: int = 15,
+        summary_keywords: Sequence[str] = SUMMARY_KEYWORDS,
+    ):
+        self._selector = selector
+        self._default_index = default_index
+        self._max_words = max_words
+        self._summary_keywords = tuple(keyword.lower() for keyword in summary_keywords)
+
+    def _get_prompt_modules(self) -> PromptMixinType:
+        return {"selector": self._selector}
+
+    def _get_prompts(self) -> PromptDictType:
+        return {}
+
+    def _update_prompts(self, prompts: PromptDictType) -> None:
+        pass
+
+    def _shortcut(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> Optional[SelectorResult]:
+        text = query.query_str.lower()
+        if self._default_index >= len(choices) or len(text.split()) >= self._max_words:
+            return None
+        if any(keyword in text for keyword in self._summary_keywords):
+            return None
+        return SelectorResult(selections=[
+            SingleSelection(index=self._default_index, reason="Short question without summary keywords.")
+        ])
+
+    def _select(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        return self._shortcut(choices, query) or self._selector.select(choices, query)
+
+    async def _aselect(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        return self._shortcut(choices, query) or await self._selector.aselect(choices, query)
+
+class PrototypeSelector(BaseSelector):
+    """Selector that routes by similarity to example questions for each choice.
+
+    prototypes holds example questions per choice, in choice order; they
+    are embedded once on first use. The query goes to the choice with the
+    most similar example when it beats every other choice by at least
+    margin, otherwise the wrapped (LLM) selector decides.
+    """
+
+    def __init__(
+        self,
+        selector: BaseSelector,
+        embed_fn: Callable[[str], List[float]],
+        prototypes: Sequence[Sequence[str]],
+        margin: float = 0.05,
+    ):
+        self._selector = selector
+        self._embed_fn = embed_fn
+        self._prototypes = [list(texts) for texts in prototypes]
+        self._margin = margin
+        self._matrices: Optional[List[np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def _get_prompt_modules(self) -> PromptMixinType:
+        return {"selector": self._selector}
+
+    def _get_prompts(self) -> PromptDictType:
+        return {}
+
+    def _update_prompts(self, prompts: PromptDictType) -> None:
+        pass
+
+    def _prototype_matrices(self) -> List[np.ndarray]:
+        if self._matrices is None:
+            with self._lock:
+                if self._matrices is None:
+                    self._matrices = [
+                        np.stack([_normalize(self._embed_fn(text)) for text in texts])
+                        for texts in self._prototypes
+                    ]
+        return self._matrices
+
+    def _shortcut(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> Optional[SelectorResult]:
+        if len(choices) != len(self._prototypes):
+            return None
+        if query.embedding is None:
+            query.embedding = self._embed_fn(query.query_str)
+        embedding = _normalize(query.embedding)
+        scores = np.array([float(np.max(matrix @ embedding)) for matrix in self._prototype_matrices()])
+        ranked = np.argsort(-scores)
+        if len(ranked) > 1 and scores[ranked[0]] - scores[ranked[1]] < self._margin:
+            return None
+        return SelectorResult(selections=[
+            SingleSelection(index=int(ranked[0]), reason="Closest to the example questions for this choice.")
+        ])
+
+    def _select(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        return self._shortcut(choices, query) or self._selector.select(choices, query)
+
+    async def _aselect(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        return self._shortcut(choices, query) or await self._selector.aselect(choices, query)
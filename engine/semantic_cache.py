@@ -0,0 +1,63 @@
+import os
+import pickle
+from typing import List, Optional
+
+import numpy as np
+
+class SemanticCache:
+    """Answer cache matched by cosine similarity of query embeddings."""
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.95):
+        self.path = path
+        self.threshold = threshold
+        self._embeddings: List[np.ndarray] = []
+        self._answers: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    @classmethod
+    def load(cls, path: str, threshold: float = 0.95) -> "SemanticCache":
+        """Load a cache pickled at path, or start an empty one."""
+        cache = cls(path, threshold)
+        try:
+            with open(path, 'rb') as f:
+                embeddings, answers = pickle.load(f)
+            cache._embeddings = list(embeddings)
+            cache._answers = list(answers)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading query cache: {e}")
+        return cache
+
+    def save(self):
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'wb') as f:
+                pickle.dump((self._embeddings, self._answers), f)
+        except Exception as e:
+            print(f"Error saving query cache: {e}")
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(self, embedding) -> Optional[str]:
+        """Return the cached answer for the most similar query above the threshold."""
+        if not self._answers:
+            return None
+        if self._matrix is None:
+            self._matrix = np.stack(self._embeddings)
+        sims = self._matrix @ self._normalize(embedding)
+        best = int(np.argmax(sims))
+        if sims[best] >= self.threshold:
+            return self._answers[best]
+        return None
+
+    def add(self, embedding, answer: str):
+        self._embeddings.append(self._normalize(embedding))
+        self._answers.append(answer)
+        self._matrix = None
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from llama_index.core.schema import NodeRelationship, TextNode
+
+from data import SummaryCache
+from engine import chunk_summaries, summarize_nodes
+
+class FakeLLM:
+    """LLM stand-in answering with a summary of the prompt's last line."""
+
+    def __init__(self):
+        self.metadata = SimpleNamespace(model_name="fake-model")
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Remaining failures per chunk text
+        self.failures = {}
+
+    async def acomplete(self, prompt):
+        self.prompts.append(prompt)
+        if self.failures.get(prompt.splitlines()[-1], 0) > 0:
+            self.failures[prompt.splitlines()[-1]] -= 1
+            raise RuntimeError("rate limited")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return SimpleNamespace(text=f" summary of {prompt.splitlines()[-1]} ")
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(chunk_summaries, "RETRY_BASE_DELAY", 0.0)
+
+@pytest.fixture
+def cache(tmp_path):
+    return SummaryCache(str(tmp_path / "summaries.sqlite"))
+
+def make_nodes(*texts):
+    return [TextNode(id_=f"n{i}", text=text, metadata={"page_label": str(i)}) for i, text in enumerate(texts)]
+
+def test_every_node_gets_a_summary_linked_to_its_chunk(cache):
+    llm = FakeLLM()
+    nodes = make_nodes("alpha", "beta")
+    summaries = asyncio.run(summarize_nodes(nodes, llm, cache))
+    assert [s.text for s in summaries] == ["summary of alpha", "summary of beta"]
+    assert [s.metadata for s in summaries] == [n.metadata for n in nodes]
+    assert [s.relationships[NodeRelationship.SOURCE].node_id for s in summaries] == ["n0", "n1"]
+
+def test_cached_and_repeated_chunks_are_not_summarized_again(cache):
+    llm = FakeLLM()
+    asyncio.run(summarize_nodes(make_nodes("alpha", "beta", "alpha"), llm, cache))
+    assert len(llm.prompts) == 2
+    again = FakeLLM()
+    summaries = asyncio.run(summarize_nodes(make_nodes("beta", "gamma"), again, cache))
+    assert [s.text for s in summaries] == ["summary of beta", "summary of gamma"]
+    assert len(again.prompts) == 1
+
+def test_requests_in_flight_are_capped(cache):
+    llm = FakeLLM()
+    asyncio.run(summarize_nodes(make_nodes(*[f"chunk {i}" for i in range(20)]), llm, cache, max_in_flight=3))
+    assert llm.max_in_flight == 3
+
+def test_failed_requests_are_retried(cache):
+    llm = FakeLLM()
+    llm.failures = {"beta": 2}
+    summaries = asyncio.run(summarize_nodes(make_nodes("alpha", "beta"), llm, cache))
+    assert [s.text for s in summaries] == ["summary of alpha", "summary of beta"]
+    assert len(llm.prompts) == 4
+
+def test_chunks_failing_every_retry_fall_back_to_their_text(cache):
+    llm = FakeLLM()
+    llm.failures = {"beta": chunk_summaries.MAX_RETRIES + 1}
+    summaries = asyncio.run(summarize_nodes(make_nodes("alpha", "beta"), llm, cache))
+    assert [s.text for s in summaries] == ["summary of alpha", "beta"]
+    # The fallback is not cached, so the next run asks for that chunk again
+    again = FakeLLM()
+    summaries = asyncio.run(summarize_nodes(make_nodes("alpha", "beta"), again, cache))
+    assert [s.text for s in summaries] == ["summary of alpha", "summary of beta"]
+    assert len(again.prompts) == 1
+
+def test_summary_cache_is_kept_per_model_beyond_the_parameter_limit(cache):
+    hashes = [f"h{i}" for i in range(1234)]
+    cache.put_many([(h, f"s{i}") for i, h in enumerate(hashes)], "model-a")
+    found = cache.get_many(hashes + hashes[:5], "model-a")
+    assert len(found) == len(hashes) and found["h7"] == "s7"
+    assert cache.get_many(hashes[:3], "model-b") == {}
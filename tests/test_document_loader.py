@@ -0,0 +1,38 @@
+import io
+
+from pypdf import PdfWriter
+
+from data import load_pdf, load_pdfs
+
+def make_pdf(pages, labels=None):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    if labels:
+        writer.set_page_label(0, pages - 1, **labels)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def test_each_page_becomes_a_document_with_its_label():
+    documents = load_pdf(make_pdf(3, {"style": "/r"}), "paper.pdf")
+    assert [d.metadata for d in documents] == [
+        {"page_label": label, "file_name": "paper.pdf"} for label in ("i", "ii", "iii")
+    ]
+
+def test_unlabelled_pages_are_numbered_from_one():
+    documents = load_pdf(make_pdf(2), "paper.pdf")
+    assert [d.metadata["page_label"] for d in documents] == ["1", "2"]
+
+def test_file_name_is_kept_out_of_embedding_and_llm_text():
+    document = load_pdf(make_pdf(1), "paper.pdf")[0]
+    assert document.excluded_embed_metadata_keys == ["file_name"]
+    assert document.excluded_llm_metadata_keys == ["file_name"]
+
+def test_files_parsed_in_worker_processes_keep_their_order():
+    files = [(make_pdf(2), "a.pdf"), (memoryview(make_pdf(1)), "b.pdf")]
+    expected = [(d.metadata["file_name"], d.metadata["page_label"]) for d in load_pdfs(files, max_workers=1)]
+    assert expected == [("a.pdf", "1"), ("a.pdf", "2"), ("b.pdf", "1")]
+    for _ in range(2):
+        documents = load_pdfs(files, max_workers=2)
+        assert [(d.metadata["file_name"], d.metadata["page_label"]) for d in documents] == expected
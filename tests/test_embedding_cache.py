@@ -0,0 +1,39 @@
+import pytest
+
+from data import EmbeddingCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "cache" / "embeddings.sqlite"))
+
+def test_text_hash_is_stable_and_distinct():
+    assert EmbeddingCache.text_hash("chunk") == EmbeddingCache.text_hash("chunk")
+    assert EmbeddingCache.text_hash("chunk") != EmbeddingCache.text_hash("chunk ")
+
+def test_embeddings_round_trip_as_float32(cache):
+    cache.put_many([("a", [0.1, 0.2, 0.3]), ("b", [1.0, -1.0])], "model")
+    found = cache.get_many(["a", "b", "missing"], "model")
+    assert sorted(found) == ["a", "b"]
+    assert found["a"] == pytest.approx([0.1, 0.2, 0.3], abs=1e-7)
+    assert found["b"] == [1.0, -1.0]
+
+def test_entries_are_kept_per_model(cache):
+    cache.put_many([("a", [1.0])], "model-a")
+    assert cache.get_many(["a"], "model-b") == {}
+    cache.put_many([("a", [2.0])], "model-b")
+    assert cache.get_many(["a"], "model-a") == {"a": [1.0]}
+    assert cache.get_many(["a"], "model-b") == {"a": [2.0]}
+
+def test_lookups_beyond_the_sqlite_parameter_limit(cache):
+    # More keys than one IN (...) clause may bind, with duplicates
+    hashes = [f"h{i}" for i in range(1234)]
+    cache.put_many([(h, [float(i)]) for i, h in enumerate(hashes)], "model")
+    found = cache.get_many(hashes + hashes[:10], "model")
+    assert len(found) == len(hashes)
+    assert found["h1233"] == [1233.0]
+
+def test_put_replaces_existing_embeddings(cache, tmp_path):
+    cache.put_many([("a", [1.0])], "model")
+    cache.put_many([("a", [3.0])], "model")
+    reopened = EmbeddingCache(str(tmp_path / "cache" / "embeddings.sqlite"))
+    assert reopened.get_many(["a"], "model") == {"a": [3.0]}
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from data import EmbeddingCache
+from engine import CachedGeminiEmbedding
+from engine import embeddings
+
+class FakeGemini:
+    """batchEmbedContents stand-in embedding each text as [len(text), 1.0]."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, request):
+        texts = [r["content"]["parts"][0]["text"] for r in json.loads(request.content)["requests"]]
+        self.batches.append(texts)
+        return httpx.Response(200, json={"embeddings": [{"values": [float(len(t)), 1.0]} for t in texts]})
+
+@pytest.fixture
+def gemini(monkeypatch):
+    fake = FakeGemini()
+    transport, async_transport = httpx.MockTransport(fake), httpx.MockTransport(fake)
+    real_client, real_async_client = httpx.Client, httpx.AsyncClient
+    monkeypatch.setattr(httpx, "Client", lambda **kwargs: real_client(transport=transport, **kwargs))
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_async_client(transport=async_transport, **kwargs))
+    monkeypatch.setattr(embeddings, "_sync_client", None)
+    return fake
+
+@pytest.fixture(autouse=True)
+def no_delays(monkeypatch):
+    monkeypatch.setattr(embeddings, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(embeddings, "START_JITTER", 0.0)
+
+@pytest.fixture
+def model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    return CachedGeminiEmbedding(cache=cache, api_key="test-key", model_name="models/embedding-001")
+
+def test_texts_are_sent_in_batches_of_at_most_100(gemini, model):
+    texts = [f"text {i}" for i in range(250)]
+    vectors = model._get_text_embeddings(texts)
+    assert [len(batch) for batch in gemini.batches] == [100, 100, 50]
+    assert vectors == [[float(len(t)), 1.0] for t in texts]
+
+def test_async_batches_match_the_sync_path(gemini, model):
+    texts = [f"text {i}" for i in range(150)]
+    vectors = asyncio.run(model._aget_text_embeddings(texts))
+    assert sorted(len(batch) for batch in gemini.batches) == [50, 100]
+    assert vectors == [[float(len(t)), 1.0] for t in texts]
+
+def test_cached_and_repeated_texts_are_not_sent_again(gemini, model):
+    model._get_text_embeddings(["a", "bb", "a"])
+    assert gemini.batches == [["a", "bb"]]
+    assert model._get_text_embeddings(["bb", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert gemini.batches[1:] == [["ccc"]]
+    asyncio.run(model._aget_text_embeddings(["a", "ccc"]))
+    assert len(gemini.batches) == 2
+
+def test_query_embeddings_are_reused_for_repeated_questions(gemini, model):
+    first = model._get_query_embedding("What is  Dropout?")
+    assert model._get_query_embedding("what is dropout?") == first
+    assert asyncio.run(model._aget_query_embedding(" WHAT is dropout? ")) == first
+    assert len(gemini.batches) == 1
+
+def test_query_cache_evicts_the_least_recently_used(gemini, model, monkeypatch):
+    monkeypatch.setattr(embeddings, "QUERY_CACHE_SIZE", 2)
+    for query in ["one", "two", "one", "three"]:
+        model._get_query_embedding(query)
+    assert len(gemini.batches) == 3
+    model._get_query_embedding("one")
+    assert len(gemini.batches) == 3
+    model._get_query_embedding("two")
+    assert len(gemini.batches) == 4
+
+class Flaky:
+    """Fails the first failures requests with status, then behaves like FakeGemini."""
+
+    def __init__(self, failures, status=429, headers=None):
+        self.failures = failures
+        self.status = status
+        self.headers = headers or {}
+        self.calls = 0
+        self.gemini = FakeGemini()
+
+    def __call__(self, request):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return httpx.Response(self.status, headers=self.headers, json={"error": "busy"})
+        return self.gemini(request)
+
+def use_transport(monkeypatch, handler):
+    real_client, real_async_client = httpx.Client, httpx.AsyncClient
+    monkeypatch.setattr(httpx, "Client", lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_async_client(transport=httpx.MockTransport(handler), **kwargs))
+    monkeypatch.setattr(embeddings, "_sync_client", None)
+
+def test_rate_limited_requests_are_retried(monkeypatch, model):
+    flaky = Flaky(failures=2, status=429, headers={"retry-after": "0"})
+    use_transport(monkeypatch, flaky)
+    assert model._get_text_embeddings(["a"]) == [[1.0, 1.0]]
+    assert flaky.calls == 3
+
+def test_server_errors_are_retried_on_the_async_path(monkeypatch, model):
+    flaky = Flaky(failures=1, status=503)
+    use_transport(monkeypatch, flaky)
+    assert asyncio.run(model._aget_text_embeddings(["a", "bb"])) == [[1.0, 1.0], [2.0, 1.0]]
+    assert flaky.calls == 2
+
+def test_retries_give_up_after_max_retries(monkeypatch, model):
+    flaky = Flaky(failures=embeddings.MAX_RETRIES + 1, status=503)
+    use_transport(monkeypatch, flaky)
+    with pytest.raises(httpx.HTTPStatusError):
+        model._get_text_embeddings(["a"])
+    assert flaky.calls == embeddings.MAX_RETRIES + 1
+
+def test_client_errors_are_not_retried(monkeypatch, model):
+    flaky = Flaky(failures=1, status=400)
+    use_transport(monkeypatch, flaky)
+    with pytest.raises(httpx.HTTPStatusError):
+        model._get_text_embeddings(["a"])
+    assert flaky.calls == 1
+
+def test_retry_delay_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(embeddings, "RETRY_BASE_DELAY", 1.0)
+    assert 2.0 <= embeddings._retry_delay(httpx.Response(429, headers={"retry-after": "2"}), 0) <= 3.0
+    # Without Retry-After the delay doubles with every attempt
+    assert 4.0 <= embeddings._retry_delay(httpx.Response(503), 2) <= 6.0
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import Response
+
+from engine import LazyQueryEngine
+
+class EchoQueryEngine(BaseQueryEngine):
+    """Query engine that answers with the question it was asked."""
+
+    def __init__(self):
+        super().__init__(callback_manager=None)
+
+    def _get_prompt_modules(self):
+        return {}
+
+    def _query(self, query_bundle):
+        return Response(response=query_bundle.query_str)
+
+    async def _aquery(self, query_bundle):
+        return self._query(query_bundle)
+
+class CountingFactory:
+    def __init__(self, failures=0):
+        self.calls = 0
+        self.failures = failures
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("build failed")
+        return EchoQueryEngine()
+
+def test_engine_is_built_on_the_first_query_only():
+    factory = CountingFactory()
+    engine = LazyQueryEngine(factory)
+    assert factory.calls == 0
+    assert str(engine.query("first")) == "first"
+    assert str(engine.query("second")) == "second"
+    assert str(asyncio.run(engine.aquery("third"))) == "third"
+    assert factory.calls == 1
+
+def test_failed_build_is_retried_on_the_next_query():
+    factory = CountingFactory(failures=1)
+    engine = LazyQueryEngine(factory)
+    with pytest.raises(RuntimeError):
+        engine.query("first")
+    assert str(engine.query("second")) == "second"
+    assert factory.calls == 2
@@ -0,0 +1,150 @@
+import asyncio
+
+from llama_index.core.base.base_selector import BaseSelector, SelectorResult, SingleSelection
+from llama_index.core.schema import QueryBundle
+from llama_index.core.tools.types import ToolMetadata
+
+from engine import CachedSelector, PrototypeSelector, ShortQuerySelector
+
+CHOICES = [
+    ToolMetadata(name="summary", description="Summary questions."),
+    ToolMetadata(name="vector", description="Specific questions."),
+]
+
+class StubSelector(BaseSelector):
+    """Selector that always picks the same choice and counts its calls."""
+
+    def __init__(self, index=0):
+        self.index = index
+        self.calls = 0
+
+    def _get_prompts(self):
+        return {}
+
+    def _update_prompts(self, prompts):
+        pass
+
+    def _select(self, choices, query):
+        self.calls += 1
+        return SelectorResult(selections=[SingleSelection(index=self.index, reason="stub")])
+
+    async def _aselect(self, choices, query):
+        return self._select(choices, query)
+
+class StubEmbedding:
+    """Embeds texts by keyword, recording every text it was asked for."""
+
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, text):
+        self.texts.append(text)
+        if "overview" in text or "summar" in text:
+            return [1.0, 0.1, 0.0]
+        if "detail" in text or "value" in text:
+            return [0.1, 1.0, 0.0]
+        return [1.0, 1.0, 0.3]
+
+def selected(selector, query, choices=CHOICES):
+    return selector.select(choices, QueryBundle(query)).selections[0].index
+
+def test_cached_selector_reuses_decisions_for_repeated_questions():
+    inner, embed = StubSelector(index=1), StubEmbedding()
+    selector = CachedSelector(inner, embed_fn=embed)
+    assert selected(selector, "What detail is reported?") == 1
+    assert selected(selector, "  what DETAIL is   reported? ") == 1
+    assert inner.calls == 1
+    # The normalized repeat is answered without embedding it
+    assert len(embed.texts) == 1
+
+def test_cached_selector_matches_similar_query_embeddings():
+    inner, embed = StubSelector(index=1), StubEmbedding()
+    selector = CachedSelector(inner, embed_fn=embed, threshold=0.9)
+    selected(selector, "Which detail is given?")
+    selected(selector, "Another detail please")
+    assert inner.calls == 1
+    selected(selector, "Give an overview")
+    assert inner.calls == 2
+
+def test_cached_selector_reuses_the_query_embedding():
+    inner, embed = StubSelector(), StubEmbedding()
+    selector = CachedSelector(inner, embed_fn=embed)
+    selector.select(CHOICES, QueryBundle("anything", embedding=[0.0, 1.0, 0.0]))
+    assert embed.texts == []
+
+def test_cached_selector_keys_decisions_by_choices():
+    inner, embed = StubSelector(), StubEmbedding()
+    selector = CachedSelector(inner, embed_fn=embed)
+    selected(selector, "Which detail is given?")
+    other_choices = [ToolMetadata(name="other", description="Something else.")] + CHOICES[1:]
+    selected(selector, "Which detail is given?", choices=other_choices)
+    assert inner.calls == 2
+
+def test_cached_selector_evicts_least_recently_used_entries():
+    inner, embed = StubSelector(), StubEmbedding()
+    selector = CachedSelector(inner, embed_fn=embed, max_entries=2)
+    selected(selector, "detail one")
+    selected(selector, "overview two")
+    selected(selector, "detail one")
+    selected(selector, "something else")
+    assert inner.calls == 3
+    assert len(selector._entries) == 2 and len(selector._exact) == 2
+    # "overview two" was the least recently used and is gone
+    selected(selector, "overview two")
+    assert inner.calls == 4
+
+def test_cached_selector_async_path():
+    inner, embed = StubSelector(index=1), StubEmbedding()
+    selector = CachedSelector(inner, embed_fn=embed)
+    for _ in range(2):
+        result = asyncio.run(selector.aselect(CHOICES, QueryBundle("a detail")))
+        assert result.selections[0].index == 1
+    assert inner.calls == 1
+
+def test_short_query_selector_routes_short_questions_to_the_default():
+    inner = StubSelector(index=0)
+    selector = ShortQuerySelector(inner, default_index=1, max_words=5)
+    assert selected(selector, "What is dropout?") == 1
+    assert inner.calls == 0
+
+def test_short_query_selector_passes_summary_and_long_questions_on():
+    inner = StubSelector(index=0)
+    selector = ShortQuerySelector(inner, default_index=1, max_words=5)
+    assert selected(selector, "Summarize the paper") == 0
+    assert selected(selector, "Tóm tắt bài báo") == 0
+    assert selected(selector, "How does the proposed method compare with the baselines?") == 0
+    assert inner.calls == 3
+
+def test_short_query_selector_ignores_a_missing_default_choice():
+    inner = StubSelector(index=0)
+    selector = ShortQuerySelector(inner, default_index=5)
+    assert selected(selector, "What is dropout?") == 0
+    assert inner.calls == 1
+
+def test_prototype_selector_routes_to_the_closest_examples():
+    inner, embed = StubSelector(index=0), StubEmbedding()
+    selector = PrototypeSelector(inner, embed_fn=embed, prototypes=[["overview"], ["detail"]])
+    assert selected(selector, "Give me a summary") == 0
+    assert selected(selector, "Which value was measured?") == 1
+    assert inner.calls == 0
+    # Prototypes are embedded once, on first use
+    assert embed.texts.count("overview") == 1 and embed.texts.count("detail") == 1
+
+def test_prototype_selector_defers_ambiguous_questions():
+    inner, embed = StubSelector(index=1), StubEmbedding()
+    selector = PrototypeSelector(inner, embed_fn=embed, prototypes=[["overview"], ["detail"]], margin=0.05)
+    assert selected(selector, "Tell me about the paper") == 1
+    assert inner.calls == 1
+
+def test_prototype_selector_defers_when_choices_do_not_match():
+    inner, embed = StubSelector(index=0), StubEmbedding()
+    selector = PrototypeSelector(inner, embed_fn=embed, prototypes=[["overview"]])
+    assert selected(selector, "Give an overview") == 0
+    assert inner.calls == 1
+
+def test_prototype_selector_async_path():
+    inner, embed = StubSelector(index=0), StubEmbedding()
+    selector = PrototypeSelector(inner, embed_fn=embed, prototypes=[["overview"], ["detail"]])
+    result = asyncio.run(selector.aselect(CHOICES, QueryBundle("one detail")))
+    assert result.selections[0].index == 1
+    assert inner.calls == 0
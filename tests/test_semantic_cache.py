@@ -0,0 +1,40 @@
+from engine import SemanticCache
+
+def test_empty_cache_misses():
+    assert SemanticCache().lookup([1.0, 0.0]) is None
+
+def test_lookup_returns_the_closest_answer_above_the_threshold():
+    cache = SemanticCache(threshold=0.95)
+    cache.add([1.0, 0.0, 0.0], "x")
+    cache.add([0.0, 2.0, 0.0], "y")
+    assert cache.lookup([0.0, 1.0, 0.01]) == "y"
+    assert cache.lookup([5.0, 0.1, 0.0]) == "x"
+    assert cache.lookup([1.0, 1.0, 0.0]) is None
+
+def test_answers_added_after_a_lookup_are_found():
+    cache = SemanticCache()
+    cache.add([1.0, 0.0], "x")
+    cache.lookup([1.0, 0.0])
+    cache.add([0.0, 1.0], "y")
+    assert cache.lookup([0.0, 1.0]) == "y"
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "cache" / "query_cache.pkl")
+    cache = SemanticCache(path, threshold=0.9)
+    cache.add([1.0, 0.0], "x")
+    cache.save()
+    loaded = SemanticCache.load(path, threshold=0.9)
+    assert loaded.lookup([1.0, 0.05]) == "x"
+    assert loaded.threshold == 0.9
+
+def test_load_missing_or_corrupt_file_starts_empty(tmp_path):
+    assert SemanticCache.load(str(tmp_path / "missing.pkl")).lookup([1.0]) is None
+    corrupt = tmp_path / "corrupt.pkl"
+    corrupt.write_bytes(b"not a pickle")
+    assert SemanticCache.load(str(corrupt)).lookup([1.0]) is None
+
+def test_cache_without_path_does_not_save(tmp_path):
+    cache = SemanticCache()
+    cache.add([1.0], "x")
+    cache.save()
+    assert list(tmp_path.iterdir()) == []
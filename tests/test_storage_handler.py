@@ -0,0 +1,95 @@
+import json
+import time
+
+import pytest
+
+from data import StorageHandler
+from data import storage_handler
+
+@pytest.fixture
+def handler(tmp_path):
+    return StorageHandler(str(tmp_path / "storage.json"))
+
+def read_lines(path):
+    with open(path, 'rb') as f:
+        return [json.loads(line) for line in f]
+
+def test_entries_are_appended_as_json_lines(handler):
+    handler.save_data({"question": "q1", "answer": "a1"})
+    handler.save_data({"question": "q2", "answer": "câu trả lời"})
+    handler.flush()
+    lines = read_lines(handler.entries_path)
+    assert [line["question"] for line in lines] == ["q1", "q2"]
+    assert lines[1]["answer"] == "câu trả lời"
+    # Timestamps are written as ISO 8601 strings
+    assert all(isinstance(line["timestamp"], str) for line in lines)
+
+def test_entries_are_written_without_orjson(handler, monkeypatch):
+    monkeypatch.setattr(storage_handler, "orjson", None)
+    handler.save_data({"answer": "câu trả lời"})
+    handler.touch_index("a")
+    storage = handler.read_storage()
+    assert storage["entries"][0]["answer"] == "câu trả lời"
+    assert isinstance(storage["entries"][0]["timestamp"], str)
+    assert isinstance(storage["indexes"]["a"]["lastUsed"], str)
+
+def test_read_storage_merges_legacy_entries_and_skips_bad_lines(handler):
+    with open(handler.storage_path, 'w', encoding='utf-8') as f:
+        json.dump({"entries": [{"legacy": True, "timestamp": "2000-01-01T00:00:00"}], "lastUpdated": None}, f)
+    handler.save_data({"new": True})
+    handler.flush()
+    with open(handler.entries_path, 'ab') as f:
+        f.write(b'{"partial": ')
+    storage = handler.read_storage()
+    assert [entry.get("legacy", False) for entry in storage["entries"]] == [True, False]
+    assert storage["lastUpdated"] == storage["entries"][-1]["timestamp"]
+
+def test_entries_are_flushed_in_the_background(handler):
+    handler.save_data({"n": 1})
+    # No flush() call: the writer thread appends the entry on its own
+    deadline = time.monotonic() + storage_handler.FLUSH_INTERVAL + 5
+    lines = []
+    while not lines and time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            lines = read_lines(handler.entries_path)
+        except FileNotFoundError:
+            pass
+    assert [line["n"] for line in lines] == [1]
+
+def test_many_entries_are_all_written(handler):
+    count = storage_handler.FLUSH_BATCH_SIZE * 3 + 5
+    for n in range(count):
+        handler.save_data({"n": n})
+    handler.flush()
+    assert [line["n"] for line in read_lines(handler.entries_path)] == list(range(count))
+
+def test_unserializable_entries_are_dropped(handler, capsys):
+    handler.save_data({"bad": object()})
+    handler.save_data({"good": 1})
+    assert handler.flush() == 1
+    assert [line.get("good") for line in read_lines(handler.entries_path)] == [1]
+    assert "Error saving data" in capsys.readouterr().out
+    # The count covers failures since the previous flush only
+    assert handler.flush() == 0
+
+def test_failed_writes_are_reported_by_flush(handler, tmp_path):
+    # A directory where the log file should be makes every append fail
+    (tmp_path / "storage.entries.jsonl").mkdir()
+    assert handler.save_data({"n": 1}) is True
+    handler.save_data({"n": 2})
+    assert handler.flush() == 2
+
+def test_evict_indexes_keeps_the_most_recently_used(handler):
+    for key in ["a", "b", "c", "d"]:
+        assert handler.touch_index(key)
+    handler.touch_index("a")
+    assert sorted(handler.evict_indexes(2)) == ["b", "c"]
+    assert sorted(handler.read_storage()["indexes"]) == ["a", "d"]
+    assert handler.evict_indexes(2) == []
+
+def test_touch_index_survives_a_new_handler(handler):
+    handler.touch_index("a")
+    handler.touch_index("b")
+    reopened = StorageHandler(handler.storage_path)
+    assert reopened.evict_indexes(1) == ["a"]
@@ -0,0 +1,167 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import MetadataFilters, VectorStoreQuery
+
+from engine import MatrixVectorStore
+from engine import vector_store
+
+DIM = 32
+
+def make_nodes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((count, DIM)).astype(np.float32)
+    nodes = [TextNode(id_=f"n{i}", text=f"chunk {i}", embedding=embeddings[i].tolist()) for i in range(count)]
+    return nodes, embeddings
+
+def exact_ranking(embeddings, q):
+    normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    sims = normed @ (q / np.linalg.norm(q))
+    return np.argsort(-sims), sims
+
+def build_store(nodes):
+    store = MatrixVectorStore()
+    store.add(nodes)
+    return store
+
+def test_quantized_rows_stay_close_to_normalized_embeddings():
+    nodes, embeddings = make_nodes(50)
+    store = build_store(nodes)
+    normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    matrix = store.matrix
+    assert store._codes.dtype == np.int8
+    assert store._scales.dtype == np.float32
+    # Rounding to the nearest code is off by at most half a step per value
+    assert np.all(np.abs(matrix - normed) <= store._scales[:, None] / 2 + 1e-6)
+
+def test_query_returns_top_k_in_descending_order():
+    nodes, embeddings = make_nodes(300)
+    store = build_store(nodes)
+    q = np.random.default_rng(1).standard_normal(DIM)
+    result = store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=10))
+    assert len(result.ids) == 10
+    assert result.similarities == sorted(result.similarities, reverse=True)
+    ranking, sims = exact_ranking(embeddings, q)
+    expected = [f"n{i}" for i in ranking[:10]]
+    assert len(set(result.ids) & set(expected)) >= 9
+    for node_id, sim in zip(result.ids, result.similarities):
+        assert sim == pytest.approx(sims[int(node_id[1:])], abs=0.02)
+
+def test_blocked_scan_matches_a_single_block(monkeypatch):
+    nodes, _ = make_nodes(100)
+    store = build_store(nodes)
+    q = np.random.default_rng(2).standard_normal(DIM).tolist()
+    whole = store.query(VectorStoreQuery(query_embedding=q, similarity_top_k=100))
+    monkeypatch.setattr(vector_store, "SCAN_BLOCK_ROWS", 7)
+    blocked = store.query(VectorStoreQuery(query_embedding=q, similarity_top_k=100))
+    assert blocked.ids == whole.ids
+    assert blocked.similarities == pytest.approx(whole.similarities, abs=1e-6)
+
+def test_top_k_larger_than_store_returns_every_row():
+    nodes, _ = make_nodes(5)
+    store = build_store(nodes)
+    result = store.query(VectorStoreQuery(query_embedding=[1.0] * DIM, similarity_top_k=50))
+    assert sorted(result.ids) == [f"n{i}" for i in range(5)]
+    assert result.similarities == sorted(result.similarities, reverse=True)
+
+def test_node_ids_restrict_the_search():
+    nodes, embeddings = make_nodes(40)
+    store = build_store(nodes)
+    wanted = ["n3", "n7", "n11", "n20"]
+    q = embeddings[7].tolist()
+    result = store.query(VectorStoreQuery(query_embedding=q, similarity_top_k=3, node_ids=wanted))
+    assert len(result.ids) == 3
+    assert set(result.ids) <= set(wanted)
+    assert result.ids[0] == "n7"
+
+def test_unknown_node_ids_and_empty_store_return_nothing():
+    nodes, _ = make_nodes(5)
+    q = [1.0] * DIM
+    result = build_store(nodes).query(VectorStoreQuery(query_embedding=q, node_ids=["missing"]))
+    assert result.ids == [] and result.similarities == []
+    result = MatrixVectorStore().query(VectorStoreQuery(query_embedding=q, similarity_top_k=3))
+    assert result.ids == []
+
+def test_metadata_filters_are_rejected():
+    store = build_store(make_nodes(3)[0])
+    with pytest.raises(ValueError):
+        store.query(VectorStoreQuery(query_embedding=[1.0] * DIM, filters=MetadataFilters(filters=[])))
+
+def test_rows_added_after_a_query_are_searched():
+    nodes, embeddings = make_nodes(20)
+    store = build_store(nodes[:10])
+    store.query(VectorStoreQuery(query_embedding=embeddings[0].tolist(), similarity_top_k=1))
+    store.add(nodes[10:])
+    result = store.query(VectorStoreQuery(query_embedding=embeddings[15].tolist(), similarity_top_k=1))
+    assert result.ids == ["n15"]
+
+def test_delete_removes_rows_of_a_document():
+    nodes, embeddings = make_nodes(6)
+    for i, node in enumerate(nodes):
+        node.relationships = {NodeRelationship.SOURCE: RelatedNodeInfo(node_id="a" if i < 3 else "b")}
+    store = build_store(nodes)
+    store.delete("a")
+    result = store.query(VectorStoreQuery(query_embedding=embeddings[0].tolist(), similarity_top_k=10))
+    assert sorted(result.ids) == ["n3", "n4", "n5"]
+
+def test_persist_and_reload_memory_maps_the_codes(tmp_path):
+    nodes, embeddings = make_nodes(64)
+    store = build_store(nodes)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    loaded = MatrixVectorStore.from_persist_dir(str(tmp_path))
+    assert isinstance(loaded._codes, np.memmap)
+    assert isinstance(loaded._scales, np.memmap)
+    q = embeddings[5].tolist()
+    expected = store.query(VectorStoreQuery(query_embedding=q, similarity_top_k=8))
+    result = loaded.query(VectorStoreQuery(query_embedding=q, similarity_top_k=8))
+    assert result.ids == expected.ids
+    assert result.similarities == pytest.approx(expected.similarities)
+
+def test_reload_rejects_other_formats(tmp_path):
+    persist_path = tmp_path / "default__vector_store.json"
+    persist_path.write_text('{"ids": [], "ref_doc_ids": [], "shape": [0, 0], "normalized": true}')
+    with pytest.raises(ValueError):
+        MatrixVectorStore.from_persist_path(str(persist_path))
+
+def test_empty_store_round_trips(tmp_path):
+    MatrixVectorStore().persist(str(tmp_path / "default__vector_store.json"))
+    loaded = MatrixVectorStore.from_persist_dir(str(tmp_path))
+    assert loaded.query(VectorStoreQuery(query_embedding=[1.0] * DIM)).ids == []
+
+@pytest.mark.skipif(vector_store.faiss is None, reason="faiss is not installed")
+def test_large_stores_are_searched_through_hnsw(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "HNSW_MIN_ROWS", 100)
+    nodes, embeddings = make_nodes(400)
+    store = build_store(nodes)
+    q = np.random.default_rng(3).standard_normal(DIM)
+    result = store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=10))
+    assert store._hnsw is not None
+    assert len(result.ids) == 10
+    assert result.similarities == sorted(result.similarities, reverse=True)
+    ranking, _ = exact_ranking(embeddings, q)
+    expected = {f"n{i}" for i in ranking[:10]}
+    assert len(expected & set(result.ids)) >= 8
+
+    # The search beam is widened to cover a similarity_top_k above efSearch
+    top_k = vector_store.HNSW_EF_SEARCH + 16
+    result = store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=top_k))
+    assert store._hnsw.hnsw.efSearch >= top_k
+    assert len(result.ids) == top_k
+
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    assert (tmp_path / ("default__vector_store.json" + vector_store.HNSW_SUFFIX)).exists()
+    loaded = MatrixVectorStore.from_persist_dir(str(tmp_path))
+    assert loaded._hnsw is not None
+    reloaded = loaded.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=10))
+    assert len(set(reloaded.ids) & expected) >= 8
+
+@pytest.mark.skipif(vector_store.faiss is None, reason="faiss is not installed")
+def test_node_id_queries_skip_hnsw(monkeypatch):
+    monkeypatch.setattr(vector_store, "HNSW_MIN_ROWS", 100)
+    nodes, embeddings = make_nodes(200)
+    store = build_store(nodes)
+    result = store.query(VectorStoreQuery(
+        query_embedding=embeddings[150].tolist(), similarity_top_k=2, node_ids=["n150", "n10"]
+    ))
+    assert result.ids[0] == "n150"
+    assert set(result.ids) == {"n150", "n10"}